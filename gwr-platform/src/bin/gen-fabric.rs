@@ -114,74 +114,31 @@ impl Args {
     }
 }
 
-struct PeIdGen {
-    num_rows: usize,
-    pe_id: usize,
-    max_pe_id: usize,
+fn pe_ids(args: &Args) -> Result<impl ExactSizeIterator<Item = (usize, usize)>, String> {
+    args.validate()?;
+    let num_rows = args.num_rows;
+    let num_pes = args.num_columns * num_rows - args.num_hbms;
+    Ok((0..num_pes).map(move |pe_id| (pe_id / num_rows, pe_id % num_rows)))
 }
 
-impl PeIdGen {
-    fn new(args: &Args) -> Result<Self, String> {
-        args.validate()?;
-        let num_nodes = args.num_columns * args.num_rows;
-        Ok(Self {
-            num_rows: args.num_rows,
-            pe_id: 0,
-            max_pe_id: num_nodes - args.num_hbms,
-        })
-    }
-}
-
-impl Iterator for PeIdGen {
-    type Item = (usize, usize);
-
-    fn next(&mut self) -> Option<Self::Item> {
-        if self.pe_id < self.max_pe_id {
-            let pe_id = self.pe_id;
-            self.pe_id += 1;
-            Some((pe_id / self.num_rows, pe_id % self.num_rows))
-        } else {
-            None
-        }
-    }
-}
-
-struct HbmIdGen {
-    num_rows: usize,
-    mem_id: usize,
-    max_mem_id: usize,
-}
-
-impl HbmIdGen {
-    fn new(args: &Args) -> Result<Self, String> {
-        args.validate()?;
-        let num_nodes = args.num_columns * args.num_rows;
-        Ok(Self {
-            num_rows: args.num_rows,
-            mem_id: num_nodes - args.num_hbms,
-            max_mem_id: num_nodes,
-        })
-    }
-}
-
-impl Iterator for HbmIdGen {
-    type Item = (usize, usize);
-
-    fn next(&mut self) -> Option<Self::Item> {
-        if self.mem_id < self.max_mem_id {
-            let mem_id = self.mem_id;
-            self.mem_id += 1;
-            Some((mem_id / self.num_rows, mem_id % self.num_rows))
-        } else {
-            None
-        }
-    }
+fn hbm_ids(args: &Args) -> Result<impl ExactSizeIterator<Item = (usize, usize)>, String> {
+    args.validate()?;
+    let num_rows = args.num_rows;
+    let num_nodes = args.num_columns * num_rows;
+    Ok((num_nodes - args.num_hbms..num_nodes)
+        .map(move |mem_id| (mem_id / num_rows, mem_id % num_rows)))
 }
 
 fn create_name(prefix: &str, column: usize, row: usize) -> String {
     format!("{prefix}_{column}_{row}")
 }
 
+/// Reference to the entity named by `create_name`, formatted in one go rather
+/// than wrapping its result. Must be kept in sync with `create_name`.
+fn create_entity_ref(kind: &str, prefix: &str, column: usize, row: usize) -> String {
+    format!("{kind}.{prefix}_{column}_{row}")
+}
+
 fn build_fabrics(args: &Args) -> Vec<FabricSection> {
     vec![FabricSection {
         name: FABRIC_NAME.to_string(),
@@ -198,23 +155,19 @@ fn build_fabrics(args: &Args) -> Vec<FabricSection> {
     }]
 }
 
-fn build_cache(
-    name: String,
+fn build_cache_config(
     kib: usize,
     bytes_per_cycle: usize,
     num_ways: usize,
     latency: usize,
-) -> CacheSection {
+) -> CacheConfigSection {
     let num_sets = (kib * 1024) / num_ways / DEFAULT_CACHE_LINE_SIZE_BYTES;
-    CacheSection {
-        name,
-        config: CacheConfigSection {
-            bw_bytes_per_cycle: Some(bytes_per_cycle),
-            line_size_bytes: Some(DEFAULT_CACHE_LINE_SIZE_BYTES),
-            num_ways: Some(num_ways),
-            num_sets: Some(num_sets),
-            delay_ticks: Some(latency),
-        },
+    CacheConfigSection {
+        bw_bytes_per_cycle: Some(bytes_per_cycle),
+        line_size_bytes: Some(DEFAULT_CACHE_LINE_SIZE_BYTES),
+        num_ways: Some(num_ways),
+        num_sets: Some(num_sets),
+        delay_ticks: Some(latency),
     }
 }
 
@@ -223,27 +176,41 @@ fn build_caches(args: &Args) -> Result<Option<Vec<CacheSection>>, String> {
         return Ok(None);
     }
 
-    let mut caches = Vec::new();
-
-    for (column, row) in PeIdGen::new(args)? {
-        if args.l1_kib != 0 {
-            caches.push(build_cache(
-                create_name("l1", column, row),
-                args.l1_kib,
-                args.l1_bytes_per_cycle,
-                args.l1_num_ways,
-                args.l1_latency,
-            ));
+    // Every PE has identical caches so only compute each level's config once
+    let l1_config = (args.l1_kib != 0).then(|| {
+        build_cache_config(
+            args.l1_kib,
+            args.l1_bytes_per_cycle,
+            args.l1_num_ways,
+            args.l1_latency,
+        )
+    });
+    let l2_config = (args.l2_kib != 0).then(|| {
+        build_cache_config(
+            args.l2_kib,
+            args.l2_bytes_per_cycle,
+            args.l2_num_ways,
+            args.l2_latency,
+        )
+    });
+
+    let pes = pe_ids(args)?;
+    let levels_per_pe = usize::from(l1_config.is_some()) + usize::from(l2_config.is_some());
+    let mut caches = Vec::with_capacity(pes.len() * levels_per_pe);
+
+    for (column, row) in pes {
+        if let Some(config) = &l1_config {
+            caches.push(CacheSection {
+                name: create_name("l1", column, row),
+                config: config.clone(),
+            });
         }
 
-        if args.l2_kib != 0 {
-            caches.push(build_cache(
-                create_name("l2", column, row),
-                args.l2_kib,
-                args.l2_bytes_per_cycle,
-                args.l2_num_ways,
-                args.l2_latency,
-            ));
+        if let Some(config) = &l2_config {
+            caches.push(CacheSection {
+                name: create_name("l2", column, row),
+                config: config.clone(),
+            });
         }
     }
 
@@ -251,20 +218,14 @@ fn build_caches(args: &Args) -> Result<Option<Vec<CacheSection>>, String> {
 }
 
 fn build_memories(args: &Args) -> Vec<MemorySection> {
-    let mut base = args.hbm_base;
-
     (0..args.num_hbms)
-        .map(|i| {
-            let mem = MemorySection {
-                name: format!("hbm{i}"),
-                kind: MemoryKind::HBM,
-                base_address: base as u64,
-                capacity_bytes: args.hbm_size as u64,
-                bw_bytes_per_cycle: None,
-                delay_ticks: Some(DEFAULT_HBM_DELAY_TICKS),
-            };
-            base += args.hbm_size;
-            mem
+        .map(|i| MemorySection {
+            name: format!("hbm{i}"),
+            kind: MemoryKind::HBM,
+            base_address: (args.hbm_base + i * args.hbm_size) as u64,
+            capacity_bytes: args.hbm_size as u64,
+            bw_bytes_per_cycle: None,
+            delay_ticks: Some(DEFAULT_HBM_DELAY_TICKS),
         })
         .collect()
 }
@@ -272,26 +233,25 @@ fn build_memories(args: &Args) -> Vec<MemorySection> {
 fn build_connections(args: &Args) -> Result<Vec<ConnectSection>, String> {
     let mut connections = Vec::new();
 
-    for (column, row) in PeIdGen::new(args)? {
-        let mut entities = vec![format!("pe.{}", create_name("pe", column, row))];
-
-        if args.l1_kib != 0 {
-            entities.push(format!("cache.{}", create_name("l1", column, row)));
-        }
-        if args.l2_kib != 0 {
-            entities.push(format!("cache.{}", create_name("l2", column, row)));
-        }
+    for (column, row) in pe_ids(args)? {
+        let l1 = (args.l1_kib != 0).then(|| create_entity_ref("cache", "l1", column, row));
+        let l2 = (args.l2_kib != 0).then(|| create_entity_ref("cache", "l2", column, row));
 
-        entities.push(format!("fabric.{FABRIC_NAME}@({column},{row})"));
-
-        for pair in entities.windows(2) {
+        // Chain PE -> caches -> fabric, only cloning the entities that
+        // appear in two connections
+        let mut from = create_entity_ref("pe", "pe", column, row);
+        for to in [l1, l2].into_iter().flatten() {
             connections.push(ConnectSection {
-                connect: vec![pair[0].clone(), pair[1].clone()],
+                connect: vec![from, to.clone()],
             });
+            from = to;
         }
+        connections.push(ConnectSection {
+            connect: vec![from, format!("fabric.{FABRIC_NAME}@({column},{row})")],
+        });
     }
 
-    for (i, (column, row)) in HbmIdGen::new(args)?.enumerate() {
+    for (i, (column, row)) in hbm_ids(args)?.enumerate() {
         connections.push(ConnectSection {
             connect: vec![
                 format!("mem.hbm{i}"),
@@ -327,7 +287,7 @@ fn build_processing_elements(
     args: &Args,
     pe_config: &ProcessingElementConfigSection,
 ) -> Result<Vec<ProcessingElementSection>, String> {
-    Ok(PeIdGen::new(args)?
+    Ok(pe_ids(args)?
         .map(|(column, row)| ProcessingElementSection {
             name: create_name("pe", column, row),
             memory_map: PE_MEMORY_MAP_NAME.to_string(),
@@ -362,3 +322,124 @@ fn main() -> Result<(), Box<dyn std::error::Error>> {
 
     Ok(())
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn parse_args(extra_args: &[&str]) -> Args {
+        Args::parse_from(
+            [
+                "gen-fabric",
+                "--num-columns",
+                "2",
+                "--num-rows",
+                "2",
+                "--hbm-base",
+                "268435456",
+                "--hbm-size",
+                "16777216",
+            ]
+            .iter()
+            .chain(extra_args),
+        )
+    }
+
+    fn names<T>(items: &[T], name: impl Fn(&T) -> &str) -> Vec<&str> {
+        items.iter().map(name).collect()
+    }
+
+    #[test]
+    fn builds_2x2_fabric_with_caches_and_hbm() {
+        let args = parse_args(&["--num-hbms", "1", "--l1-kib", "32", "--l2-kib", "256"]);
+        let platform = build_platform(&args).expect("platform should build");
+
+        let pes = platform.processing_elements.expect("PEs should be present");
+        assert_eq!(
+            names(&pes, |pe| pe.name.as_str()),
+            ["pe_0_0", "pe_0_1", "pe_1_0"]
+        );
+        assert!(pes.iter().all(|pe| pe.memory_map == PE_MEMORY_MAP_NAME));
+
+        let caches = platform.caches.expect("caches should be present");
+        assert_eq!(
+            names(&caches, |cache| cache.name.as_str()),
+            ["l1_0_0", "l2_0_0", "l1_0_1", "l2_0_1", "l1_1_0", "l2_1_0"]
+        );
+        for cache in &caches {
+            let (num_ways, num_sets) = if cache.name.starts_with("l1") {
+                (4, 256)
+            } else {
+                (8, 1024)
+            };
+            assert_eq!(cache.config.num_ways, Some(num_ways));
+            assert_eq!(cache.config.num_sets, Some(num_sets));
+            assert_eq!(
+                cache.config.line_size_bytes,
+                Some(DEFAULT_CACHE_LINE_SIZE_BYTES)
+            );
+        }
+
+        let memories = platform.memories.expect("memories should be present");
+        assert_eq!(names(&memories, |mem| mem.name.as_str()), ["hbm0"]);
+        assert_eq!(memories[0].base_address, 0x1000_0000);
+        assert_eq!(memories[0].capacity_bytes, 0x100_0000);
+        assert_eq!(
+            names(&platform.memory_maps[0].devices, |device| device
+                .name
+                .as_str()),
+            ["hbm0"]
+        );
+
+        let connections: Vec<Vec<String>> = platform
+            .connections
+            .expect("connections should be present")
+            .into_iter()
+            .map(|connection| connection.connect)
+            .collect();
+        let mut expected = Vec::new();
+        for (column, row) in [(0, 0), (0, 1), (1, 0)] {
+            let pe = format!("pe.pe_{column}_{row}");
+            let l1 = format!("cache.l1_{column}_{row}");
+            let l2 = format!("cache.l2_{column}_{row}");
+            let fabric = format!("fabric.fabric0@({column},{row})");
+            expected.push(vec![pe, l1.clone()]);
+            expected.push(vec![l1, l2.clone()]);
+            expected.push(vec![l2, fabric]);
+        }
+        expected.push(vec![
+            "mem.hbm0".to_string(),
+            "fabric.fabric0@(1,1)".to_string(),
+        ]);
+        assert_eq!(connections, expected);
+    }
+
+    #[test]
+    fn builds_fabric_without_caches() {
+        let args = parse_args(&["--num-hbms", "1"]);
+        let platform = build_platform(&args).expect("platform should build");
+
+        assert!(platform.caches.is_none());
+        let connections = platform.connections.expect("connections should be present");
+        assert_eq!(connections.len(), 4);
+        assert_eq!(
+            connections[0].connect,
+            ["pe.pe_0_0", "fabric.fabric0@(0,0)"]
+        );
+    }
+
+    #[test]
+    fn places_hbms_contiguously_from_base() {
+        let args = parse_args(&["--num-hbms", "3"]);
+        let memories = build_memories(&args);
+
+        let bases: Vec<u64> = memories.iter().map(|mem| mem.base_address).collect();
+        assert_eq!(bases, [0x1000_0000, 0x1100_0000, 0x1200_0000]);
+        assert_eq!(
+            hbm_ids(&args)
+                .expect("args should be valid")
+                .collect::<Vec<_>>(),
+            [(0, 1), (1, 0), (1, 1)]
+        );
+    }
+}
@@ -8,8 +8,8 @@ use serde_yaml::Value;
 
 /// Parse a value which could be an integer or a string and return u64 value
 ///
-/// The string can be a hex string with underscores or a Byte string that
-/// specifies units. Some examples are:
+/// The string can be a hex string with underscores (a single `0x` or `0X`
+/// prefix) or a Byte string that specifies units. Some examples are:
 ///  0x10000000
 ///  0x1000_0000
 ///  10B
@@ -31,27 +31,25 @@ where
         return Ok(number);
     }
 
-    let s = match value.as_str() {
-        Some(s) => s.to_owned(),
-        None => {
-            return Err(de::Error::custom(format!(
-                "'{value:?}': Unsupported type for Deserialize (should be u64 or String)"
-            )));
-        }
+    let Some(s) = value.as_str() else {
+        return Err(de::Error::custom(format!(
+            "'{value:?}': Unsupported type for Deserialize (should be u64 or String)"
+        )));
     };
 
-    // Convert to lowercase in order to standardise any 0x prefix
-    let lowercase = s.to_lowercase();
-
-    if lowercase.starts_with("0x") {
-        let without_underscore = lowercase.replace('_', "");
-        let without_0x = without_underscore.trim_start_matches("0x");
-        u64::from_str_radix(without_0x, 16)
-            .map_err(|e| de::Error::custom(format!("Unable to parse {s} as hex string: {e}")))
+    // Addresses are parsed for every memory and tensor, so only allocate when
+    // there are underscores that need to be removed
+    if let Some(hex) = s.strip_prefix("0x").or_else(|| s.strip_prefix("0X")) {
+        let parsed = if hex.contains('_') {
+            u64::from_str_radix(&hex.replace('_', ""), 16)
+        } else {
+            u64::from_str_radix(hex, 16)
+        };
+        parsed.map_err(|e| de::Error::custom(format!("Unable to parse {s} as hex string: {e}")))
     } else {
         // Don't ignore case so that bit (b) and Byte (B) can be distinguished
         let ignore_case = false;
-        let num_bytes = Byte::parse_str(&s, ignore_case)
+        let num_bytes = Byte::parse_str(s, ignore_case)
             .map_err(|e| de::Error::custom(format!("Unable to parse {s} as Byte string: {e}")))?;
         Ok(num_bytes.as_u64())
     }
@@ -193,3 +191,44 @@ pub enum MemoryKind {
 pub struct ConnectSection {
     pub connect: Vec<String>,
 }
+
+#[cfg(test)]
+mod tests {
+    use serde::Deserialize;
+
+    use super::parse_u64_byte_str;
+
+    #[derive(Debug, Deserialize)]
+    struct Address {
+        #[serde(deserialize_with = "parse_u64_byte_str")]
+        addr: u64,
+    }
+
+    fn parse_addr(yaml: &str) -> Result<u64, serde_yaml::Error> {
+        serde_yaml::from_str::<Address>(yaml).map(|address| address.addr)
+    }
+
+    #[test]
+    fn parses_hex_strings_with_either_prefix_case() {
+        assert_eq!(parse_addr(r#"addr: "0X1F""#).unwrap(), 0x1f);
+        assert_eq!(parse_addr(r#"addr: "0x1f""#).unwrap(), 0x1f);
+    }
+
+    #[test]
+    fn parses_underscore_grouped_hex() {
+        assert_eq!(parse_addr("addr: 0x1_0000_0000").unwrap(), 0x1_0000_0000);
+        assert_eq!(parse_addr(r#"addr: "0X1000_0000""#).unwrap(), 0x1000_0000);
+    }
+
+    #[test]
+    fn parses_byte_unit_strings() {
+        assert_eq!(parse_addr("addr: 10MiB").unwrap(), 10 * 1024 * 1024);
+    }
+
+    #[test]
+    fn rejects_malformed_hex() {
+        assert!(parse_addr(r#"addr: "0x""#).is_err());
+        // Only a single prefix is stripped
+        assert!(parse_addr(r#"addr: "0x0x10""#).is_err());
+    }
+}
@@ -9,7 +9,7 @@ use std::fmt::Write as _;
 use serde::Serialize;
 use serde_yaml::Value;
 
-use crate::types::{CacheConfigSection, PlatformConfig, ProcessingElementConfigSection};
+use crate::types::PlatformConfig;
 
 /// Format a `u64` as lowercase hexadecimal with a `0x` prefix and underscores
 /// inserted every 4 hex digits (grouped from the right).
@@ -41,7 +41,7 @@ fn emit_line(
     line: impl std::fmt::Display,
     indent_level: usize,
 ) -> Result<(), std::fmt::Error> {
-    writeln!(out, "{}{line}", "  ".repeat(indent_level))
+    writeln!(out, "{:width$}{line}", "", width = indent_level * 2)
 }
 
 fn start_section(section: &str) -> Result<String, std::fmt::Error> {
@@ -78,6 +78,26 @@ fn serializable_to_str<T: Serialize>(value: &T) -> Result<String, Box<dyn std::e
     }
 }
 
+/// Map each config to the index of its first occurrence among the distinct
+/// configs, returning the number of distinct configs and the per-item indices.
+fn config_anchor_indices<'a, T: PartialEq + 'a>(
+    configs: impl Iterator<Item = &'a T>,
+) -> (usize, Vec<usize>) {
+    let mut unique_configs: Vec<&T> = Vec::new();
+    let indices = configs
+        .map(
+            |config| match unique_configs.iter().position(|cfg| *cfg == config) {
+                Some(idx) => idx,
+                None => {
+                    unique_configs.push(config);
+                    unique_configs.len() - 1
+                }
+            },
+        )
+        .collect();
+    (unique_configs.len(), indices)
+}
+
 fn emit_memory_maps(
     platform: &PlatformConfig,
 ) -> Result<Option<String>, Box<dyn std::error::Error>> {
@@ -106,20 +126,12 @@ fn emit_processing_elements(
 
     let mut out = start_section("processing_elements")?;
 
-    let mut unique_configs: Vec<ProcessingElementConfigSection> = Vec::new();
-    for pe in processing_elements {
-        if !unique_configs.iter().any(|cfg| cfg == &pe.config) {
-            unique_configs.push(pe.config.clone());
-        }
-    }
-    let mut emitted_anchors = vec![false; unique_configs.len()];
+    let (num_unique_configs, config_indices) =
+        config_anchor_indices(processing_elements.iter().map(|pe| &pe.config));
+    let mut emitted_anchors = vec![false; num_unique_configs];
 
-    for pe in processing_elements {
+    for (pe, config_idx) in processing_elements.iter().zip(config_indices) {
         let config = &pe.config;
-        let config_idx = unique_configs
-            .iter()
-            .position(|cfg| cfg == config)
-            .ok_or("PE config not found in unique configs")?;
         let anchor = format!("pe_config_{config_idx}");
 
         emit_line(&mut out, format_args!("- name: {}", pe.name), 1)?;
@@ -212,19 +224,11 @@ fn emit_caches(platform: &PlatformConfig) -> Result<Option<String>, Box<dyn std:
 
     let mut out = start_section("caches")?;
 
-    let mut unique_configs: Vec<CacheConfigSection> = Vec::new();
-    for cache in caches {
-        if !unique_configs.iter().any(|cfg| cfg == &cache.config) {
-            unique_configs.push(cache.config.clone());
-        }
-    }
-    let mut emitted_anchors = vec![false; unique_configs.len()];
+    let (num_unique_configs, config_indices) =
+        config_anchor_indices(caches.iter().map(|cache| &cache.config));
+    let mut emitted_anchors = vec![false; num_unique_configs];
 
-    for cache in caches {
-        let config_idx = unique_configs
-            .iter()
-            .position(|cfg| cfg == &cache.config)
-            .ok_or("cache config not found in unique configs")?;
+    for (cache, config_idx) in caches.iter().zip(config_indices) {
         let anchor = format!("cache_config_{config_idx}");
         let config = &cache.config;
 
@@ -21,6 +21,7 @@
 
 use std::collections::HashSet;
 use std::fmt::Display;
+use std::io::{BufWriter, Write};
 use std::path::PathBuf;
 use std::{fs, io};
 
@@ -1114,10 +1115,14 @@ fn main() -> Result<()> {
     let out_path = args.out.clone();
     let generator = Generator::new(args, &platform)?;
     let timetable = generate(generator)?;
-    let yaml = serde_yaml::to_string(&timetable)
+    // Serialise straight to the file rather than building the whole YAML
+    // document in memory first
+    let write_error =
+        |e: &dyn Display| error_from_str(format!("failed to write {}: {e}", out_path.display()));
+    let mut writer = BufWriter::new(fs::File::create(&out_path).map_err(|e| write_error(&e))?);
+    serde_yaml::to_writer(&mut writer, &timetable)
         .map_err(|e| error_from_str(format!("failed to serialise timetable YAML: {e}")))?;
-    fs::write(&out_path, yaml)
-        .map_err(|e| error_from_str(format!("failed to write {}: {e}", out_path.display())))?;
+    writer.flush().map_err(|e| write_error(&e))?;
     info!("Wrote graph to {}", out_path.display());
     Ok(())
 }